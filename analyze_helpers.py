@@ -7,88 +7,301 @@
 
 import json
 import re
+import sys
+import threading
 import yaml
 import os
+import stat
+import mmap
+import functools
+import hashlib
+import heapq
+from itertools import repeat
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+# Verbose per-entity / per-match diagnostics - formatting these dominates runtime
+# on large installs, so they are off unless you are debugging detection
+_DEBUG = False
+
+# orjson ships with Home Assistant and parses the large .storage files several
+# times faster than the stdlib json module; it also serializes the JSON report
+# straight to UTF-8 bytes
+try:
+    import orjson
+    _json_loads = orjson.loads
+    
+    def _json_dumps_report(data):
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+except ImportError:
+    _json_loads = json.loads
+    
+    def _json_dumps_report(data):
+        return json.dumps(data, indent=2, ensure_ascii=False)
+
+# Optional: pyahocorasick matches many substrings in a single pass over the text
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# Optional: google-re2 scans in guaranteed linear time. It has no lookaround, so only
+# the plain template-string pattern below is compiled with it
+try:
+    import re2 as _fast_re
+except ImportError:
+    _fast_re = re
+
+# Prefer the libyaml-backed loader, fall back to the pure-Python one
+_YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+# Domains whose entities can be helpers
+_HELPER_DOMAINS = (
+    'binary_sensor', 'sensor', 'input_boolean', 'input_datetime', 'input_number',
+    'input_select', 'input_text', 'timer', 'counter', 'schedule'
+)
+
+# Any helper entity ID in template code - this also covers the arguments of
+# states('...'), is_state('...') and state_attr('...'). The lookahead doesn't consume,
+# so both links of a dotted chain like timer.sensor.x are reported
+_TEMPLATE_ENTITY_RE = re.compile(r'\b(?=((?:' + '|'.join(_HELPER_DOMAINS) + r')\.[a-zA-Z0-9_]+)\b)')
+
+# Any helper entity ID in dashboard content that isn't part of a longer dotted name
+_DASHBOARD_ENTITY_RE = re.compile(r'(?<![A-Za-z0-9_.])((?:' + '|'.join(_HELPER_DOMAINS) + r')\.[a-zA-Z0-9_]+)')
+
+# The same pattern for mapped file bytes - it only involves ASCII characters, so it
+# finds exactly the same IDs in UTF-8 bytes as in the decoded text
+_DASHBOARD_ENTITY_BYTES_RE = re.compile(_DASHBOARD_ENTITY_RE.pattern.encode('ascii'))
+
+# Entity IDs in integration config entry values - deliberately permissive, no word
+# boundaries, so IDs embedded in longer JSON strings are found too. Matches may
+# overlap, except that binary_sensor.x does not also report sensor.x
+_CONFIG_ENTRY_ENTITY_RE = re.compile(
+    r'(?=((?:input_[a-zA-Z_][a-zA-Z0-9_]*|counter|timer|binary_sensor|(?<!binary_)sensor|schedule)'
+    r'\.[a-zA-Z0-9_]+))',
+    re.IGNORECASE
+)
+
+# Entity references in template strings, in one pass: either state access
+# (states.domain.entity.state / .attributes, groups 1-2) or any domain.entity token
+# (group 3) - the token also finds entity IDs that are quoted or passed to
+# states()/is_state()/state_attr()/area_id()/..., so those need no patterns of their own
+_TEMPLATE_STRING_ENTITY_RE = _fast_re.compile(
+    r'(?i)states\.([a-z_]+)\.([a-z0-9_]+)(?:\.state|\.attributes)'
+    r'|\b([a-z_]+\.[a-z0-9_]+)\b'
+)
+
+# Start of a states.domain.entity access, which names an entity without spelling out its ID
+_STATES_ACCESS_MARKER_RE = re.compile(r'states\.', re.IGNORECASE)
+
+# Every helper entity ID contains one of these substrings ('sensor.' also covers binary_sensor)
+_HELPER_ID_MARKERS = ('sensor.', 'input_', 'timer.', 'counter.', 'schedule.')
+_HELPER_ID_MARKER_BYTES = tuple(marker.encode('ascii') for marker in _HELPER_ID_MARKERS)
+
+# File reads release the GIL, so a few threads overlap disk latency on slow /config storage
+_FILE_READ_WORKERS = 8
+
+# Config and dashboard files larger than this are not read - no real YAML or
+# dashboard is anywhere near it, but a stray blob named .yaml would stall the scan
+_MAX_SCAN_FILE_SIZE = 16 * 1024 * 1024
+
+# Per-file result caches are OrderedDicts of path -> (stamp, value), most recently used
+# last. The scan caches are filled from several pool threads, so one lock guards them all
+_file_cache_lock = threading.Lock()
+
+@pyscript_compile
+def file_stamp(file_path):
+    """Return (mtime_ns, size) for a file - cached results stay valid while this is unchanged"""
+    st = os.stat(file_path)
+    return st.st_mtime_ns, st.st_size
+
+@pyscript_compile
+def file_cache_get(cache, file_path, stamp):
+    """Return the value cached for file_path under stamp and mark it recently used, or None"""
+    with _file_cache_lock:
+        entry = cache.get(file_path)
+        if entry is None or entry[0] != stamp:
+            return None
+        cache.move_to_end(file_path)
+        return entry[1]
+
+@pyscript_compile
+def file_cache_put(cache, file_path, stamp, value, max_entries):
+    """Cache value for file_path under stamp, evicting the least recently used entry when full"""
+    with _file_cache_lock:
+        cache[file_path] = (stamp, value)
+        cache.move_to_end(file_path)
+        if len(cache) > max_entries:
+            cache.popitem(last=False)
+
+# Parsed .storage JSON by path
+_json_cache = OrderedDict()
+_JSON_CACHE_MAX_ENTRIES = 8
+
+@pyscript_compile
+def _load_json_cached(file_path):
+    """Load a JSON file, reusing the parsed data while its mtime and size are unchanged"""
+    stamp = file_stamp(file_path)
+    data = file_cache_get(_json_cache, file_path, stamp)
+    if data is not None:
+        return data
+    
+    with open(file_path, 'rb') as f:
+        data = _json_loads(f.read())
+    
+    file_cache_put(_json_cache, file_path, stamp, data, _JSON_CACHE_MAX_ENTRIES)
+    return data
+
+@pyscript_compile
+def is_scannable_file(entry):
+    """Check that a DirEntry or path is a regular file that is neither empty nor oversized"""
+    try:
+        st = entry.stat() if isinstance(entry, os.DirEntry) else os.stat(entry)
+    except OSError:
+        return False
+    return stat.S_ISREG(st.st_mode) and 0 < st.st_size <= _MAX_SCAN_FILE_SIZE
+
+@pyscript_compile
+def append_unique_file(file_paths, seen_real_paths, file_path):
+    """Append file_path unless the file it resolves to (following symlinks) is already listed, returning whether it was added"""
+    real_path = os.path.realpath(file_path)
+    if real_path in seen_real_paths:
+        return False
+    seen_real_paths.add(real_path)
+    file_paths.append(file_path)
+    return True
 
 # PyScript file I/O functions using @pyscript_executor decorator
 # These are compiled to native Python and run in separate threads
-@pyscript_executor
-def read_text_file(file_path):
-    """Read text file using proper PyScript I/O pattern"""
+@pyscript_compile
+def scan_file_mapped(file_path, scan):
+    """Run scan over a read-only mmap of a file in the calling thread, returning (result, error)
+    
+    The scanner reads the page cache directly instead of a bytes or str copy of the
+    whole file; it must not keep references into the mapping.
+    """
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return f.read(), None
+        with open(file_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return scan(b''), None
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return scan(mm), None
     except Exception as exc:
         return None, exc
 
+@pyscript_compile
+def may_reference_helpers_mapped(buf):
+    """may_reference_helpers for mapped file bytes"""
+    for marker in _HELPER_ID_MARKER_BYTES:
+        if buf.find(marker) != -1:
+            return True
+    return False
+
+@pyscript_compile
+def dashboard_entities_from_buffer(buf):
+    """Extract helper entity IDs from mapped dashboard bytes without decoding the file"""
+    if not may_reference_helpers_mapped(buf):
+        return set()
+    
+    # One pass over the content finds every helper entity ID, whether it appears as
+    # entity: sensor.example, - sensor.example, "sensor.example" or inside card/action config
+    return {match.decode('ascii') for match in _DASHBOARD_ENTITY_BYTES_RE.findall(buf)}
+
+@pyscript_compile
+def scan_dashboard_file_sync(file_path):
+    """Map one dashboard file and extract its helper entity IDs in the calling thread, returning (entities, error)"""
+    return scan_file_mapped(file_path, dashboard_entities_from_buffer)
+
 @pyscript_executor
-def write_text_file(file_path, content):
-    """Write text file using proper PyScript I/O pattern"""
+def scan_dashboard_files(file_paths):
+    """Run scan_dashboard_file_sync over several files on a thread pool, returning one result per path in order"""
+    if not file_paths:
+        return []
+    with ThreadPoolExecutor(max_workers=_FILE_READ_WORKERS) as pool:
+        return list(pool.map(scan_dashboard_file_sync, file_paths))
+
+@pyscript_compile
+def write_text_file_sync(file_path, content):
+    """Write text (or already UTF-8 encoded bytes) in the calling thread, returning (success, error)"""
     try:
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(content)
+        if isinstance(content, bytes):
+            with open(file_path, 'wb') as f:
+                f.write(content)
+        else:
+            with open(file_path, 'w', encoding='utf-8') as f:
+                f.write(content)
         return True, None
     except Exception as exc:
         return False, exc
 
+@pyscript_executor
+def write_text_files(files):
+    """Write several (file_path, content) pairs in one executor call, returning (success, error) per file in order"""
+    return [write_text_file_sync(file_path, content) for file_path, content in files]
+
+# Registry platforms whose sensors are helpers even when they have a config entry
+_CONFIG_ENTRY_HELPER_PLATFORMS = frozenset(['template', 'statistics'])
+
+# Registry domains handled specially: always-helper domains (besides input_*) and the
+# sensor domains that template/statistics helpers live in
+_REGISTRY_HELPER_DOMAINS = frozenset(['counter', 'timer'])
+_REGISTRY_SENSOR_DOMAINS = frozenset(['sensor', 'binary_sensor'])
+
+# All registry platforms that provide helper entities
+_HELPER_PLATFORMS = _CONFIG_ENTRY_HELPER_PLATFORMS | frozenset([
+    'integral', 'derivative', 'history_stats', 'trend', 'threshold', 'utility_meter',
+    'group', 'combine', 'times_of_the_day', 'mold_indicator'
+])
+
 @pyscript_executor
 def examine_entity_registry():
     """Examine the entity registry to understand helper patterns using proper PyScript I/O"""
     try:
-        import json
         entity_registry_file = '/config/.storage/core.entity_registry'
         
-        with open(entity_registry_file, 'r', encoding='utf-8') as f:
-            entity_registry = json.load(f)
+        entity_registry = _load_json_cached(entity_registry_file)
             
         entities = entity_registry.get('data', {}).get('entities', [])
-        print(f"Entity registry contains {len(entities)} entities")
         
         # Look for template-related entries
         template_sensors = []
         helper_entities = []
+        skipped_integration_count = 0
         
         for entity in entities:
             entity_id = entity.get('entity_id', '')
             platform = entity.get('platform', '')
             config_entry_id = entity.get('config_entry_id')
+            domain = entity_id.partition('.')[0]
+            is_sensor = domain in _REGISTRY_SENSOR_DOMAINS
             
+            # The same IDs come back from templates, config files and config entries;
+            # interning shares one string object between all of them
+            entity_id = sys.intern(entity_id)
             
             # Traditional helpers - input_*, counter, timer are always considered helpers regardless of source
-            if entity_id.startswith(('input_', 'counter.', 'timer.')):
+            if domain in _REGISTRY_HELPER_DOMAINS or domain.startswith('input_'):
                 # Debug specific entities
-                if 'ca_' in entity_id:
+                if _DEBUG and 'ca_' in entity_id:
                     print(f"DEBUG: Adding CA helper entity {entity_id} (config_entry_id: {config_entry_id}, platform: {platform})")
                     
                 helper_entities.append(entity_id)
             
             # FIRST: Skip integration entities with config_entry_id (except template/statistics platforms which are helpers)
-            elif config_entry_id and (entity_id.startswith(('sensor.', 'binary_sensor.')) and platform not in ['template', 'statistics']):
-                print(f"Skipping integration entity: {entity_id} (config_entry_id: {config_entry_id}, platform: {platform})")
-                continue
-            
-            # Template entities (these are the missing helpers!)
-            elif platform == 'template':
-                template_sensors.append(entity_id)
-                print(f"Template helper found: {entity_id} (platform: {platform})")
+            elif is_sensor and config_entry_id and platform not in _CONFIG_ENTRY_HELPER_PLATFORMS:
+                skipped_integration_count += 1
             
-            # Statistics entities (also helpers!)
-            elif platform == 'statistics':
+            # Template, statistics and other helper platforms (these are the missing helpers!)
+            elif platform in _HELPER_PLATFORMS:
                 template_sensors.append(entity_id)
-                print(f"Statistics helper found: {entity_id} (platform: {platform})")
-            
-            # Other helper platforms
-            elif platform in ['integral', 'derivative', 'history_stats', 'trend', 'threshold', 'utility_meter', 'group', 'combine', 'times_of_the_day', 'mold_indicator']:
-                template_sensors.append(entity_id)
-                print(f"Helper found: {entity_id} (platform: {platform})")
             
             # Entities without config entries (could be from configuration.yaml templates)
-            elif not config_entry_id and (entity_id.startswith('sensor.') or entity_id.startswith('binary_sensor.')):
+            elif is_sensor and not config_entry_id:
                 template_sensors.append(entity_id)
-                print(f"Potential template helper found: {entity_id} (no config entry)")
         
-        print(f"Found {len(template_sensors)} template helpers in registry")
-        print(f"Found {len(helper_entities)} traditional helpers in registry")
+        print(f"Entity registry: processed {len(entities)} entities - {len(helper_entities)} traditional helpers, "
+              f"{len(template_sensors)} template helpers, {skipped_integration_count} integration sensors skipped; "
+              f"first 10 template helpers: {template_sensors[:10]}")
         
         return template_sensors + helper_entities, None
         
@@ -96,69 +309,132 @@ def examine_entity_registry():
         print(f"Error examining entity registry: {exc}")
         return None, exc
 
-@pyscript_executor
-def read_config_file(file_path):
-    """Read a config file using proper PyScript I/O"""
-    import builtins
-    with builtins.open(file_path, 'r', encoding='utf-8') as f:
-        return f.read()
-
-@pyscript_executor
-def analyze_integration_config_entries():
-    """Analyze integration config entries to find helper references using proper PyScript I/O"""
-    import json
+@pyscript_compile
+def analyze_config_content(file_path, content, helpers, helper_automaton=None):
+    """Parse and scan the text of one YAML config file, returning (entities, direct_matches, error)"""
+    direct_matches = find_substrings(content, helpers, helper_automaton)
+    
+    # Lovelace YAML is only searched for entity IDs, which the raw text answers
+    # without a full parse
+    if 'lovelace' in os.path.basename(file_path) or '/dashboards/' in file_path:
+        return set(_DASHBOARD_ENTITY_RE.findall(content)), direct_matches, None
+    
+    # Any helper ID the YAML walk could find is spelled out in the text, so it is
+    # already a direct match - unless it is built from states.domain.name access or
+    # hidden behind a double-quoted escape. Without those, the parse can't add a helper
+    if not direct_matches and '\\' not in content and not _STATES_ACCESS_MARKER_RE.search(content):
+        return set(), direct_matches, None
     
     try:
-        print("DEBUG: Starting integration config analysis...")
-        config_entries_file = '/config/.storage/core.config_entries'
-        print(f"DEBUG: Attempting to read {config_entries_file}")
-        
-        with open(config_entries_file, 'r', encoding='utf-8') as f:
-            config_entries = json.load(f)
-        entries = config_entries.get('data', {}).get('entries', [])
-        print(f"DEBUG: Found {len(entries)} integration config entries")
-        print(f"DEBUG: Integration config analysis starting with {len(entries)} entries")
-        
-        helper_references = set()
+        yaml_data = yaml.load(content, Loader=_YAML_LOADER)
+        return analyze_yaml_data(yaml_data), direct_matches, None
+    except Exception as exc:
+        return set(), direct_matches, exc
+
+# Config file scan results by path, stamped with the file's (mtime_ns, size) and the
+# fingerprint of the helper IDs they were matched against
+_config_scan_cache = OrderedDict()
+_CONFIG_SCAN_CACHE_MAX_ENTRIES = 1000
+
+@pyscript_compile
+def helper_ids_fingerprint(helpers):
+    """Return a short digest identifying a set of helper IDs, independent of their order"""
+    return hashlib.blake2b('\n'.join(sorted(helpers)).encode('utf-8'), digest_size=16).digest()
+
+@pyscript_compile
+def analyze_config_file_sync(file_path, helpers, helpers_fingerprint, helper_automaton=None):
+    """Read, parse and scan one YAML config file in the calling thread
+    
+    Returns (entities, direct_matches, error). entities are the references found by
+    walking the parsed YAML, direct_matches the helpers whose entity IDs occur anywhere
+    in the raw text. If the file can't be read both are None; if it can't be parsed or
+    walked, entities is empty and error says why. Files unchanged since an earlier run
+    with the same helpers (same helpers_fingerprint) are not read again.
+    """
+    try:
+        stamp = file_stamp(file_path) + (helpers_fingerprint,)
+        cached = file_cache_get(_config_scan_cache, file_path, stamp)
+        if cached is not None:
+            return cached
         
-        def find_entities_in_value(value, path="", key_name=""):
-            """Recursively search for entity references in any value"""
-            if isinstance(value, str):
-                # Look for entity IDs in strings - improved patterns to catch ca_ entities
-                import re
-                entity_patterns = [
-                    # More permissive patterns to catch entity IDs in JSON values
-                    r'(input_[a-zA-Z_][a-zA-Z0-9_]*\.[a-zA-Z0-9_]+)',
-                    r'(counter\.[a-zA-Z0-9_]+)',
-                    r'(timer\.[a-zA-Z0-9_]+)',
-                    r'(sensor\.[a-zA-Z0-9_]+)',  # This should catch sensor.ca_droplet_flow_rate
-                    r'(binary_sensor\.[a-zA-Z0-9_]+)',  # This should catch binary_sensor.ca_hot_water_running
-                    r'(schedule\.[a-zA-Z0-9_]+)'
-                ]
+        with open(file_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+    except Exception as exc:
+        return None, None, exc
+    
+    entities, direct_matches, error = analyze_config_content(file_path, content, helpers, helper_automaton)
+    result = (frozenset(entities), frozenset(direct_matches), error)
+    file_cache_put(_config_scan_cache, file_path, stamp, result, _CONFIG_SCAN_CACHE_MAX_ENTRIES)
+    return result
+
+@pyscript_executor
+def analyze_config_files(file_paths, helpers, helper_automaton=None):
+    """Run analyze_config_file_sync over several files on a thread pool, returning one result per path in order"""
+    if not file_paths:
+        return []
+    # Fingerprint the helper IDs once per run rather than comparing them per cached file
+    helpers_fingerprint = helper_ids_fingerprint(helpers)
+    with ThreadPoolExecutor(max_workers=_FILE_READ_WORKERS) as pool:
+        return list(pool.map(analyze_config_file_sync, file_paths, repeat(helpers),
+                             repeat(helpers_fingerprint), repeat(helper_automaton)))
+
+# The last config entry walk as (parsed entries object, result) - reused while
+# _load_json_cached keeps returning the same object, so both analyses share one walk
+_config_entry_scan = None
+
+@pyscript_compile
+def scan_config_entries(config_entries):
+    """Walk every config entry once, returning (helper_references, ui_template_dependencies)
+    
+    helper_references is every entity ID found anywhere in the entries;
+    ui_template_dependencies maps "UI Template: <title>" to the helpers used by each
+    UI-created template's state template.
+    """
+    global _config_entry_scan
+    if _config_entry_scan is not None and _config_entry_scan[0] is config_entries:
+        return _config_entry_scan[1]
+    
+    entries = config_entries.get('data', {}).get('entries', [])
+    helper_references = set()
+    ui_template_dependencies = {}
+    
+    def find_entities_in_value(root):
+        """Search every string in a JSON value for entity references"""
+        # Parsed JSON only holds exact dict/list/str types, so type() checks suffice
+        stack = [root]
+        while stack:
+            value = stack.pop()
+            value_type = type(value)
+            
+            if value_type is str:
+                # The shortest possible match is timer.x, and most leaves (UUIDs,
+                # timestamps, flags, names) have no dot at all
+                if len(value) < 7 or '.' not in value:
+                    continue
                 
-                for pattern in entity_patterns:
-                    matches = re.findall(pattern, value, re.IGNORECASE)
+                # Look for entity IDs in strings - improved patterns to catch ca_ entities
+                matches = _CONFIG_ENTRY_ENTITY_RE.findall(value)
+                helper_references.update(map(sys.intern, matches))
+                if _DEBUG:
                     for match in matches:
-                        helper_references.add(match)
                         if 'ca_' in match.lower():
-                            print(f"*** FOUND CA ENTITY in config: {match} (key: {key_name}, path: {path}) ***")
-                        print(f"Found helper reference in integration config: {match} (key: {key_name}, path: {path})")
+                            print(f"*** FOUND CA ENTITY in config: {match} ***")
+                        print(f"Found helper reference in integration config: {match}")
             
-            elif isinstance(value, dict):
-                for key, nested_value in value.items():
-                    find_entities_in_value(nested_value, f"{path}.{key}" if path else key, key)
+            elif value_type is dict:
+                stack.extend(value.values())
             
-            elif isinstance(value, list):
-                for i, nested_value in enumerate(value):
-                    find_entities_in_value(nested_value, f"{path}[{i}]" if path else f"[{i}]", f"[{i}]")
+            elif value_type is list:
+                stack.extend(value)
+    
+    for entry in entries:
+        entry_id = entry.get('entry_id', 'unknown')
+        domain = entry.get('domain', 'unknown')
+        title = entry.get('title', 'unknown')
         
-        for entry in entries:
-            entry_id = entry.get('entry_id', 'unknown')
-            domain = entry.get('domain', 'unknown')
-            title = entry.get('title', 'unknown')
-            
+        if _DEBUG:
             print(f"Analyzing integration: {domain} - {title} (ID: {entry_id})")
-            
+        
             # Debug all integration entries to see their structure
             if domain in ['homeassistant', 'template', 'group'] or 'remote' in title.lower():
                 print(f"DEBUG: Integration {domain} - {title} structure:")
@@ -175,116 +451,117 @@ def analyze_integration_config_entries():
                             break
                 else:
                     print(f"DEBUG: Entry sample: {entry_str[:300]}...") 
-            
-            # Check all data in the config entry
-            find_entities_in_value(entry, f"integration.{domain}")
+        
+        # UI-created template helpers also contribute their own dependencies
+        if domain == 'template':
+            template_state = entry.get('options', {}).get('state', '')
+            if template_state:
+                dependencies = extract_template_dependencies(template_state)
+                if dependencies:
+                    ui_template_dependencies[f"UI Template: {entry.get('title', '')}"] = dependencies
+        
+        # Check all data in the config entry
+        find_entities_in_value(entry)
+    
+    result = (helper_references, ui_template_dependencies)
+    _config_entry_scan = (config_entries, result)
+    return result
+
+@pyscript_executor
+def analyze_integration_config_entries():
+    """Analyze integration config entries to find helper references using proper PyScript I/O"""
+    try:
+        print("DEBUG: Starting integration config analysis...")
+        config_entries_file = '/config/.storage/core.config_entries'
+        print(f"DEBUG: Attempting to read {config_entries_file}")
+        
+        config_entries = _load_json_cached(config_entries_file)
+        entries = config_entries.get('data', {}).get('entries', [])
+        print(f"DEBUG: Found {len(entries)} integration config entries")
+        print(f"DEBUG: Integration config analysis starting with {len(entries)} entries")
+        
+        helper_references, _ = scan_config_entries(config_entries)
         
         print(f"DEBUG: Found {len(helper_references)} helper references in integration configs")
         
-        # DEBUG: Manual search for CA entities
-        config_str = str(config_entries).lower()
-        if 'ca_droplet_flow_rate' in config_str:
-            print("DEBUG: *** MANUAL SEARCH FOUND ca_droplet_flow_rate in config_entries ***")
-        if 'ca_hot_water_running' in config_str:
-            print("DEBUG: *** MANUAL SEARCH FOUND ca_hot_water_running in config_entries ***")
-        if 'ca_location_mode' in config_str:
-            print("DEBUG: *** MANUAL SEARCH FOUND ca_location_mode in config_entries ***")
+        if _DEBUG:
+            # DEBUG: Manual search for CA entities
+            config_str = str(config_entries).lower()
+            if 'ca_droplet_flow_rate' in config_str:
+                print("DEBUG: *** MANUAL SEARCH FOUND ca_droplet_flow_rate in config_entries ***")
+            if 'ca_hot_water_running' in config_str:
+                print("DEBUG: *** MANUAL SEARCH FOUND ca_hot_water_running in config_entries ***")
+            if 'ca_location_mode' in config_str:
+                print("DEBUG: *** MANUAL SEARCH FOUND ca_location_mode in config_entries ***")
         
-        return list(helper_references), None
+        return frozenset(helper_references), None
         
     except Exception as exc:
         print(f"Error analyzing integration config entries: {exc}")
         return None, exc
 
+@pyscript_compile
+def template_dependencies_from_buffer(buf):
+    """Extract helper dependencies from mapped file bytes, decoding only files that may have some"""
+    if not may_reference_helpers_mapped(buf):
+        return set()
+    return extract_template_dependencies(buf[:].decode('utf-8'))
+
+# Template dependencies per config file by path, stamped with the file's (mtime_ns, size)
+_template_scan_cache = OrderedDict()
+_TEMPLATE_SCAN_CACHE_MAX_ENTRIES = 1000
+
+@pyscript_compile
+def template_dependencies_from_file(file_path):
+    """Map one file and extract its helper dependencies in the calling thread, returning (dependencies, error)
+    
+    Unchanged files (same mtime and size as last run) are not read again.
+    """
+    try:
+        stamp = file_stamp(file_path)
+    except Exception as exc:
+        return None, exc
+    
+    cached = file_cache_get(_template_scan_cache, file_path, stamp)
+    if cached is not None:
+        return cached, None
+    
+    dependencies, error = scan_file_mapped(file_path, template_dependencies_from_buffer)
+    if error:
+        return None, error
+    dependencies = frozenset(dependencies)
+    file_cache_put(_template_scan_cache, file_path, stamp, dependencies, _TEMPLATE_SCAN_CACHE_MAX_ENTRIES)
+    return dependencies, None
+
 @pyscript_executor  
-def analyze_template_dependencies():
+def analyze_template_dependencies(config_files):
     """Analyze template helpers to find their dependencies on other helpers using proper PyScript I/O"""
-    import json
-    import re
-    import os
-    
     template_dependencies = {}
     
-    def extract_template_dependencies(template_text):
-        """Extract entity references from template code"""
-        if not template_text:
-            return set()
-        
-        dependencies = set()
-        
-        # Patterns to find entity references in templates
-        patterns = [
-            r"states\(['\"]([a-z0-9_]+\.[a-z0-9_]+)['\"]\)",  # states('entity.id')
-            r"states\('([^']+)'\)",  # states('entity.id') - more permissive
-            r'states\("([^"]+)"\)',  # states("entity.id")
-            r"is_state\(['\"]([a-z0-9_]+\.[a-z0-9_]+)['\"]",  # is_state('entity.id')
-            r"state_attr\(['\"]([a-z0-9_]+\.[a-z0-9_]+)['\"]",  # state_attr('entity.id')
-            r"\b(input_[a-z_]+\.[a-z0-9_]+)\b",  # Direct entity references
-            r"\b(binary_sensor\.[a-z0-9_]+)\b",
-            r"\b(sensor\.[a-z0-9_]+)\b",
-            r"\b(timer\.[a-z0-9_]+)\b",
-            r"\b(counter\.[a-z0-9_]+)\b",
-            r"\b(schedule\.[a-z0-9_]+)\b"
-        ]
-        
-        for pattern in patterns:
-            matches = re.findall(pattern, template_text, re.IGNORECASE)
-            for match in matches:
-                entity_id = match if isinstance(match, str) else match[0]
-                
-                # Only include entities that could be helpers
-                helper_domains = ['binary_sensor', 'sensor', 'input_boolean', 'input_datetime', 'input_number', 'input_select', 'input_text', 'timer', 'counter', 'schedule']
-                is_helper = False
-                for domain in helper_domains:
-                    if entity_id.startswith(domain + '.'):
-                        is_helper = True
-                        break
-                if is_helper:
-                    dependencies.add(entity_id)
-        
-        return dependencies
-    
     try:
         # Get template helpers from config entries (UI-created)
         config_entries_file = '/config/.storage/core.config_entries'
-        with open(config_entries_file, 'r', encoding='utf-8') as f:
-            config_entries = json.load(f)
+        config_entries = _load_json_cached(config_entries_file)
         
-        entries = config_entries.get('data', {}).get('entries', [])
-        for entry in entries:
-            if entry.get('domain') == 'template':
-                title = entry.get('title', '')
-                options = entry.get('options', {})
-                template_state = options.get('state', '')
-                
-                if template_state:
-                    dependencies = extract_template_dependencies(template_state)
-                    if dependencies:
-                        template_dependencies[f"UI Template: {title}"] = dependencies
+        _, ui_template_dependencies = scan_config_entries(config_entries)
+        template_dependencies.update(ui_template_dependencies)
     
     except Exception as e:
         print(f"Error analyzing UI template dependencies: {e}")
     
-    # Dynamically scan ALL configuration files for template dependencies
-    # This replaces the stupid hardcoded list with proper discovery
-    config_files = get_config_files()
+    # Dynamically scan ALL configuration files for template dependencies, reading
+    # and scanning them in parallel worker threads
+    with ThreadPoolExecutor(max_workers=_FILE_READ_WORKERS) as pool:
+        file_results = list(pool.map(template_dependencies_from_file, config_files))
     
-    for config_file in config_files:
-        try:
-            # Use proper PyScript I/O pattern
-            content, error = read_text_file(config_file)
-            if error:
-                continue
-            
-            # Analyze entire file content for entity references
-            file_name = config_file.split('/')[-1]
-            dependencies = extract_template_dependencies(content)
-            if dependencies:
-                template_dependencies[f"File: {file_name}"] = dependencies
-                    
-        except Exception as e:
-            print(f"Error reading {config_file}: {e}")
+    for config_file, (dependencies, error) in zip(config_files, file_results):
+        if error:
             continue
+        
+        # Analyze entire file content for entity references
+        if dependencies:
+            file_name = config_file.split('/')[-1]
+            template_dependencies[f"File: {file_name}"] = dependencies
     
     return template_dependencies, None
 
@@ -293,277 +570,162 @@ def analyze_helpers(**kwargs):
     """Service wrapper - creates async task"""
     task.create(analyze_helpers_async())
 
+# Domains that are always helpers (input_* domains are matched by prefix)
+_HELPER_INPUT_DOMAINS = frozenset(['counter', 'timer', 'variable'])
+
+# Domains that include template helpers and other helper entities created via UI
+# (template sensors, switches, lights, etc. created through the helpers UI)
+_HELPER_STATE_DOMAINS = frozenset([
+    'sensor', 'binary_sensor', 'switch', 'light', 'cover', 'fan', 'climate', 'lock',
+    'number', 'select', 'text', 'button', 'time', 'date', 'datetime'
+])
+
 def is_helper_entity(entity_id):
     """Determine if an entity is a helper - expanded to match HA UI definition"""
+    domain = entity_id.partition('.')[0]
+    
     # Traditional input helpers
-    if (entity_id.startswith('input_') or 
-        entity_id.startswith('counter.') or 
-        entity_id.startswith('timer.') or
-        entity_id.startswith('variable.')):
+    if domain in _HELPER_INPUT_DOMAINS or domain.startswith('input_'):
         return True
     
-    # Template helpers and other helper entities created via UI
-    # These include template sensors, switches, lights, etc. created through helpers UI
-    if (entity_id.startswith('sensor.') or 
-        entity_id.startswith('binary_sensor.') or
-        entity_id.startswith('switch.') or
-        entity_id.startswith('light.') or
-        entity_id.startswith('cover.') or
-        entity_id.startswith('fan.') or
-        entity_id.startswith('climate.') or
-        entity_id.startswith('lock.') or
-        entity_id.startswith('number.') or
-        entity_id.startswith('select.') or
-        entity_id.startswith('text.') or
-        entity_id.startswith('button.') or
-        entity_id.startswith('time.') or
-        entity_id.startswith('date.') or
-        entity_id.startswith('datetime.')):
-        
-        # Check if this is actually a helper by examining its attributes
+    # Check if this is actually a helper by examining its attributes
+    if domain in _HELPER_STATE_DOMAINS:
         return is_template_or_helper_entity(entity_id)
     
     return False
 
+# Attributes that strongly suggest an integration entity rather than a template helper
+_INTEGRATION_INDICATORS = frozenset([
+    'integration_method', 'flow_sensor_value', 'detectors_flow', 'sampling_active_seconds',
+    'current_session_start', 'last_session_end', 'session_stage', 'volume_unit',
+    'entity_registry_enabled_default', 'entity_registry_visible_default', 'platform',
+    'supported_features', 'assumed_state', 'should_poll', 'state_class', 'last_reset',
+    'attribution', 'source_type', 'restored'  # These often indicate integration/system entities
+])
+
+# Attributes a UI-created helper of any domain may carry
+_BASIC_HELPER_ATTRS = frozenset(['friendly_name', 'device_class', 'icon', 'unique_id', 'entity_category'])
+
+# Entity attributes fetched during the current analysis run, keyed by entity_id
+_attr_cache = {}
+
+def get_entity_attributes(entity_id):
+    """Return an entity's attributes, fetching each entity at most once per run"""
+    attrs = _attr_cache.get(entity_id)
+    if attrs is None:
+        try:
+            attrs = state.getattr(entity_id) or {}
+        except:
+            attrs = {}
+        _attr_cache[entity_id] = attrs
+    return attrs
+
 def is_template_or_helper_entity(entity_id):
     """Check if a sensor/binary_sensor/etc is actually a template helper"""
-    # Template sensors/binary_sensors (user-created helpers)
-    if entity_id.startswith('sensor.') or entity_id.startswith('binary_sensor.'):
-        try:
-            # Access entity attributes through PyScript state API
-            try:
-                attrs = state.getattr(entity_id) or {}
-            except:
-                attrs = {}
-                
-                # Now that we can access attributes properly, let's use them for template helper detection
-                
-                # Template helpers are typically characterized by:
-                # 1. Having very few attributes (usually just basic ones like friendly_name, device_class, icon)
-                # 2. NOT having complex integration-specific attributes
-                # 3. May or may not have unique_id (inconsistent)
-                # 4. Should NOT have attributes that clearly indicate integration origin
-                
-                if attrs:
-                    # These attributes strongly suggest an integration entity, not a template helper
-                    integration_indicators = [
-                        'integration_method', 'flow_sensor_value', 'detectors_flow', 'sampling_active_seconds',
-                        'current_session_start', 'last_session_end', 'session_stage', 'volume_unit',
-                        'entity_registry_enabled_default', 'entity_registry_visible_default', 'platform',
-                        'supported_features', 'assumed_state', 'should_poll', 'state_class', 'last_reset',
-                        'attribution', 'source_type', 'restored'  # These often indicate integration/system entities
-                    ]
-                    
-                    # Check if this has integration-specific attributes
-                    has_integration_attrs = any(indicator in attrs for indicator in integration_indicators)
-                    
-                    if has_integration_attrs:
-                        # This is clearly from an integration, not a template helper
-                        return False
-                    
-                    # Template helpers typically have minimal attributes and may not have unique_id
-                    basic_attrs = {'friendly_name', 'device_class', 'icon', 'unique_id'}
-                    attr_keys = set(attrs.keys())
-                    
-                    # Template helper detection based on actual patterns seen:
-                    # Template helpers typically have exactly these attributes:
-                    # - friendly_name, device_class, icon (3 attributes)
-                    # - Sometimes friendly_name, device_class, icon, unique_id (4 attributes)
-                    
-                    template_helper_patterns = [
-                        # Pattern 1: friendly_name + device_class + icon (no unique_id)
-                        {'friendly_name', 'device_class', 'icon'},
-                        # Pattern 2: friendly_name + device_class + icon + unique_id
-                        {'friendly_name', 'device_class', 'icon', 'unique_id'},
-                        # Pattern 3: Just friendly_name + device_class (minimal)
-                        {'friendly_name', 'device_class'}
-                    ]
-                    
-                    # Check if the entity matches any template helper pattern
-                    for pattern in template_helper_patterns:
-                        if (attr_keys == pattern and not has_integration_attrs):
-                            return True
-                
-                # Method 4: Check for integration-specific attributes that indicate it's NOT a template helper
-                if attrs:
-                    # Integration entities have specific complex attributes that template helpers don't have
-                    # These are very specific to integrations, not template helpers
-                    definitive_integration_indicators = [
-                        'integration_method', 'flow_sensor_value', 'detectors_flow', 'sampling_active_seconds',
-                        'current_session_start', 'last_session_end', 'session_stage', 'volume_unit',
-                        'supported_features', 'assumed_state', 'should_poll', 'state_class', 'last_reset',
-                        'attribution', 'unit_of_measurement', 'options', 'device_id'
-                    ]
-                    
-                    has_integration_attrs = any(indicator in attrs for indicator in definitive_integration_indicators)
-                    
-                    if has_integration_attrs:
-                        # This is clearly from an integration, not a template helper
-                        return False
-                
-                # Method 5: For remaining entities, be more conservative
-                # Only identify as template helper if it has the minimal template helper signature:
-                # - Basic UI helper attributes (device_class, icon, friendly_name)  
-                # - No complex integration attributes
-                # - No unique_id (many template helpers don't have them)
-                # - Reasonable entity naming (not from obvious integrations)
-                
-                attr_keys = set(attrs.keys()) if attrs else set()
-                
-                # Template helpers often have these basic attributes
-                basic_template_indicators = {'friendly_name', 'device_class', 'icon'}
-                
-                # Exclude if it has these attributes (suggests integration origin)
-                complex_indicators = {
-                    'unique_id', 'supported_features', 'restored', 'state_class', 
-                    'unit_of_measurement', 'last_changed', 'last_updated'
-                }
-                
-                has_basic_attrs = bool(attr_keys & basic_template_indicators)
-                has_complex_attrs = bool(attr_keys & complex_indicators)
-                
-                # Very conservative: only flag as template helper if it looks exactly like one
-                if (has_basic_attrs and not has_complex_attrs and 
-                    len(attr_keys) <= 4 and  # Very few attributes
-                    not attrs.get('unique_id')):  # No unique_id
-                    
-                    # Final check: make sure it's not from obvious integrations
-                    obvious_integration_patterns = [
-                        'motion', 'person', 'vehicle', 'pet', 'microphone',  # Camera integrations
-                        'water_monitor', 'watt_monitor', 'backup', 'mobile_app', 
-                        'fully_kiosk', 'reolink', 'sonos', 'ca_', 'sm_g998u1', 
-                        'fire_tablet', 'sun_', 'day_night_state'
-                    ]
-                    
-                    is_from_obvious_integration = False
-                    for pattern in obvious_integration_patterns:
-                        if pattern in entity_id.lower():
-                            is_from_obvious_integration = True
-                            break
-                    
-                    if not is_from_obvious_integration:
-                        log.info(f"Detected template helper by conservative analysis: {entity_id}")
-                        return True
-                
-                # Method 4: Check if it's explicitly marked as template integration
-                integration = attrs.get('integration', '') if attrs else ''
-                platform = attrs.get('platform', '') if attrs else ''
-                if integration == 'template' or 'template' in str(platform):
-                    log.info(f"Detected template helper by integration: {entity_id}")
-                    return True
-                
-                # Method 5: Template helpers created via UI often have minimal attributes
-                attr_keys = set(attrs.keys()) if attrs else set()
-                
-                # Exclude entities that have complex device/integration attributes
-                complex_indicators = {
-                    'unique_id', 'device_id', 'area_id', 'entity_registry_enabled_default',
-                    'entity_registry_visible_default', 'supported_features', 'restored',
-                    'state_class', 'unit_of_measurement'
-                }
-                
-                # Template helpers often have these basic attributes
-                basic_template_indicators = {
-                    'friendly_name', 'device_class', 'icon'
-                }
-                
-                # Check if this looks like a simple template helper
-                has_complex_attrs = bool(attr_keys & complex_indicators)
-                has_basic_attrs = bool(attr_keys & basic_template_indicators)
-                
-                # If it has basic attributes but minimal complex attributes, likely a template helper
-                if (has_basic_attrs and not attrs.get('unique_id') and 
-                    len(attr_keys - basic_template_indicators - {'friendly_name'}) <= 2):
-                    log.info(f"Detected template helper by attributes: {entity_id}")
-                    return True
-                    
-        except Exception as e:
-            log.warning(f"Error checking entity {entity_id}: {e}")
+    attrs = get_entity_attributes(entity_id)
+    if not attrs:
+        return False
     
-    # For other entity types (switch, light, cover, etc.), check if they're template helpers
-    try:
-        attrs = state.getattr(entity_id) or {}
-        if not attrs:
-            return False
-            
-        # Template helpers typically have minimal attributes and no integration markers
-        integration_indicators = [
-            'integration_method', 'flow_sensor_value', 'detectors_flow', 'sampling_active_seconds',
-            'current_session_start', 'last_session_end', 'session_stage', 'volume_unit',
-            'entity_registry_enabled_default', 'entity_registry_visible_default', 'platform',
-            'supported_features', 'assumed_state', 'should_poll', 'state_class', 'last_reset',
-            'attribution', 'source_type', 'restored'
-        ]
-        
-        has_integration_attrs = any(indicator in attrs for indicator in integration_indicators)
-        
-        if has_integration_attrs:
-            return False
-            
-        # Template helpers often have minimal attributes
-        attr_keys = set(attrs.keys())
-        basic_helper_attrs = {'friendly_name', 'device_class', 'icon', 'unique_id', 'entity_category'}
-        
-        # If it has only basic attributes and no integration markers, likely a template helper
-        if len(attr_keys) <= 5 and attr_keys.issubset(basic_helper_attrs):
-            return True
-            
-    except:
-        pass
+    # Template helpers typically have minimal attributes and no integration markers
+    if _INTEGRATION_INDICATORS & attrs.keys():
+        return False
     
-    return False
+    # If it has only basic attributes and no integration markers, likely a template helper
+    return _BASIC_HELPER_ATTRS.issuperset(attrs)
 
 # The examine_entity_registry function is now implemented with @pyscript_executor above
 
+@pyscript_compile
+def build_substring_automaton(needles):
+    """Build an Aho-Corasick automaton over needles, or None when pyahocorasick isn't installed"""
+    if ahocorasick is None or not needles:
+        return None
+    automaton = ahocorasick.Automaton()
+    for needle in needles:
+        automaton.add_word(needle, needle)
+    automaton.make_automaton()
+    return automaton
+
+@pyscript_compile
+def contains_any_substring(text, needles, automaton=None):
+    """Return True if any needle occurs in text - one automaton pass when available"""
+    if automaton is not None:
+        for _ in automaton.iter(text):
+            return True
+        return False
+    for needle in needles:
+        if needle in text:
+            return True
+    return False
+
+# Template section markers (any case), searched for in the raw file bytes in a single pass
+_TEMPLATE_SECTION_RE = re.compile(rb'template:|platform:[ \t]*template', re.IGNORECASE)
+
+@pyscript_compile
+def scan_template_file(file_path, name_needles, name_automaton=None):
+    """Check one YAML file for template definitions, returning (found, error)
+    
+    The section markers are searched in a read-only mmap of the file, so files that
+    have them are never decoded; the text is only built and lowercased for the
+    entity name fallback.
+    """
+    try:
+        with open(file_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return False, None
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if _TEMPLATE_SECTION_RE.search(mm):
+                    return True, None
+                if not name_needles:
+                    return False, None
+                content = mm[:].decode('utf-8')
+        return contains_any_substring(content.lower(), name_needles, name_automaton), None
+    except Exception as exc:
+        return False, exc
+
+@pyscript_executor
+def scan_template_files(file_paths, name_needles, name_automaton=None):
+    """Run scan_template_file over several files on a thread pool, returning (found, error) per path in order"""
+    if not file_paths:
+        return []
+    with ThreadPoolExecutor(max_workers=_FILE_READ_WORKERS) as pool:
+        return list(pool.map(scan_template_file, file_paths, repeat(name_needles), repeat(name_automaton)))
+
+@pyscript_compile
+def find_substrings(text, needles, automaton=None):
+    """Return the set of needles occurring in text - one automaton pass when available"""
+    if automaton is not None:
+        return {needle for _, needle in automaton.iter(text)}
+    return {needle for needle in needles if needle in text}
+
+@pyscript_compile
+def may_reference_helpers(text):
+    """Cheap substring check run before any regex - False means text cannot contain a helper entity ID"""
+    for marker in _HELPER_ID_MARKERS:
+        if marker in text:
+            return True
+    return False
+
+@pyscript_compile
 def extract_template_dependencies(template_text):
     """Extract entity references from template code"""
-    if not template_text:
+    if not template_text or not may_reference_helpers(template_text):
         return set()
     
-    dependencies = set()
-    
-    # Patterns to find entity references in templates
-    patterns = [
-        r"states\(['\"]([a-z0-9_]+\.[a-z0-9_]+)['\"]\)",  # states('entity.id')
-        r"states\('([^']+)'\)",  # states('entity.id') - more permissive
-        r'states\("([^"]+)"\)',  # states("entity.id")
-        r"is_state\(['\"]([a-z0-9_]+\.[a-z0-9_]+)['\"]",  # is_state('entity.id')
-        r"state_attr\(['\"]([a-z0-9_]+\.[a-z0-9_]+)['\"]",  # state_attr('entity.id')
-        r"\b(input_[a-z_]+\.[a-z0-9_]+)\b",  # Direct entity references
-        r"\b(binary_sensor\.[a-z0-9_]+)\b",
-        r"\b(sensor\.[a-z0-9_]+)\b",
-        r"\b(timer\.[a-z0-9_]+)\b",
-        r"\b(counter\.[a-z0-9_]+)\b",
-        r"\b(schedule\.[a-z0-9_]+)\b"
-    ]
+    if _DEBUG:
+        # Debug logging: log first 200 chars of template text being analyzed
+        preview = template_text[:200].replace('\n', ' ').replace('\r', '')
+        print(f"Analyzing template text: {preview}...")
     
-    # Debug logging: log first 200 chars of template text being analyzed
-    preview = template_text[:200].replace('\n', ' ').replace('\r', '')
-    log.info(f"Analyzing template text: {preview}...")
-    
-    total_matches = 0
-    for pattern in patterns:
-        matches = re.findall(pattern, template_text, re.IGNORECASE)
-        if matches:
-            log.info(f"Pattern '{pattern}' found {len(matches)} matches: {matches[:5]}")  # Show first 5 matches
-            total_matches += len(matches)
-        for match in matches:
-            entity_id = match if isinstance(match, str) else match[0]
-            
-            # Only include entities that could be helpers
-            helper_domains = ['binary_sensor', 'sensor', 'input_boolean', 'input_datetime', 'input_number', 'input_select', 'input_text', 'timer', 'counter', 'schedule']
-            is_helper = False
-            for domain in helper_domains:
-                if entity_id.startswith(domain + '.'):
-                    is_helper = True
-                    break
-            if is_helper:
-                dependencies.add(entity_id)
-    
-    if total_matches == 0:
-        log.info("No entity references found in template text")
-    else:
-        log.info(f"Found {len(dependencies)} helper dependencies: {list(dependencies)[:10]}")
+    # A single pass picks up helper entity IDs whether they appear bare or
+    # inside states()/is_state()/state_attr() calls
+    dependencies = set(map(sys.intern, _TEMPLATE_ENTITY_RE.findall(template_text)))
+    
+    if _DEBUG:
+        if not dependencies:
+            print("No entity references found in template text")
+        else:
+            print(f"Found {len(dependencies)} helper dependencies: {list(dependencies)[:10]}")
     
     return dependencies
 
@@ -574,8 +736,7 @@ def discover_template_files():
     # Get list of template entities from entity registry to guide our search
     try:
         registry_file = '/config/.storage/core.entity_registry'
-        content = read_text_file(registry_file)
-        registry = json.loads(content)
+        registry = task.executor(_load_json_cached, registry_file)
         
         template_entity_names = set()
         entities = registry.get('data', {}).get('entities', [])
@@ -607,59 +768,46 @@ def discover_template_files():
         '/config/packages'
     ]
     
+    # Lowercase the names once and match them all in a single pass per file
+    template_name_needles = [name.lower() for name in template_entity_names if name]
+    template_name_automaton = build_substring_automaton(template_name_needles)
+    
+    # Skip certain files that are unlikely to contain templates
+    skip_files = ['secrets.yaml', 'known_devices.yaml']
+    
     import os
+    candidate_files = []
     for search_path in search_paths:
         try:
             if not os.path.exists(search_path):
                 continue
                 
             # Get all files in directory (not recursive to avoid PyScript issues)
-            items = os.listdir(search_path)
-            for item in items:
-                if item.endswith(('.yaml', '.yml')):
-                    file_path = os.path.join(search_path, item)
-                    
-                    # Skip certain files that are unlikely to contain templates
-                    skip_files = ['secrets.yaml', 'known_devices.yaml']
-                    should_skip = False
-                    for skip_file in skip_files:
-                        if skip_file in file_path:
-                            should_skip = True
-                            break
-                    if should_skip:
+            # DirEntry caches the file type from the directory read, saving a stat per entry
+            with os.scandir(search_path) as entries:
+                for entry in entries:
+                    if not entry.name.endswith(('.yaml', '.yml')):
                         continue
-                    
-                    try:
-                        content = read_text_file(file_path)
-                        
-                        # Check if file contains template definitions
-                        content_lower = content.lower()
-                        has_template_section = False
-                        template_patterns = ['template:', 'platform: template', '- platform: template']
-                        for pattern in template_patterns:
-                            if pattern in content_lower:
-                                has_template_section = True
-                                break
-                        
-                        # Check if file contains any of our known template entity names
-                        has_template_entities = False
-                        for name in template_entity_names:
-                            if name and name.lower() in content_lower:
-                                has_template_entities = True
-                                break
-                        
-                        if has_template_section or has_template_entities:
-                            template_files.append(file_path)
-                            log.info(f"Found template definitions in: {file_path}")
-                            
-                    except Exception as e:
-                        # Skip files that can't be read
+                    if any(skip_file in entry.name for skip_file in skip_files):
                         continue
-                        
+                    if entry.is_file() and is_scannable_file(entry):
+                        candidate_files.append(entry.path)
+        
         except Exception as e:
             log.info(f"Error searching {search_path}: {e}")
             continue
     
+    # Scan all candidates in parallel worker threads
+    scan_results = scan_template_files(candidate_files, template_name_needles, template_name_automaton)
+    for file_path, (found, error) in zip(candidate_files, scan_results):
+        if error:
+            # Skip files that can't be read
+            continue
+        
+        if found:
+            template_files.append(file_path)
+            log.info(f"Found template definitions in: {file_path}")
+    
     return template_files
 
 # The analyze_template_dependencies function is now implemented with @pyscript_executor above
@@ -667,22 +815,23 @@ def discover_template_files():
 async def analyze_dashboard_dependencies():
     """Analyze Lovelace dashboards to find entity references"""
     dashboard_dependencies = set()
-    dashboard_file_mapping = {}  # Track which file each entity was found in
+    dashboard_file_mapping = defaultdict(list)  # Track which file each entity was found in
     
     # Focus on actual dashboard storage locations where UI dashboards are stored
     dashboard_files = []
+    # Canonical paths already listed, so a dashboard reachable through several paths
+    # (symlinks, or the fixed names below overlapping a directory listing) is scanned once
+    seen_dashboard_paths = set()
     
     # Primary focus: .storage/lovelace* files (where UI-controlled dashboards live)
     try:
         storage_dir = '/config/.storage'
         if os.path.isdir(storage_dir):
-            storage_files = os.listdir(storage_dir)
-            for filename in storage_files:
-                if filename.startswith('lovelace'):
-                    full_path = os.path.join(storage_dir, filename)
-                    if os.path.isfile(full_path):
-                        dashboard_files.append(full_path)
-                        log.info(f"Found dashboard storage file: {filename}")
+            with os.scandir(storage_dir) as entries:
+                for entry in entries:
+                    if entry.name.startswith('lovelace') and entry.is_file() and is_scannable_file(entry):
+                        if append_unique_file(dashboard_files, seen_dashboard_paths, entry.path):
+                            log.info(f"Found dashboard storage file: {entry.name}")
     except Exception as e:
         log.info(f"Could not scan .storage directory: {e}")
     
@@ -695,8 +844,7 @@ async def analyze_dashboard_dependencies():
     ]
     
     for yaml_file in yaml_dashboard_files:
-        if os.path.isfile(yaml_file):
-            dashboard_files.append(yaml_file)
+        if is_scannable_file(yaml_file) and append_unique_file(dashboard_files, seen_dashboard_paths, yaml_file):
             log.info(f"Found YAML dashboard file: {yaml_file}")
     
     # Check dashboard directories for additional files
@@ -704,39 +852,31 @@ async def analyze_dashboard_dependencies():
     for dash_dir in dashboard_dirs:
         try:
             if os.path.isdir(dash_dir):
-                filenames = os.listdir(dash_dir)
-                for filename in filenames:
-                    if filename.endswith(('.yaml', '.yml')):
-                        full_path = os.path.join(dash_dir, filename)
-                        if full_path not in dashboard_files:
-                            dashboard_files.append(full_path)
+                with os.scandir(dash_dir) as entries:
+                    for entry in entries:
+                        if entry.name.endswith(('.yaml', '.yml')) and entry.is_file() and is_scannable_file(entry):
+                            append_unique_file(dashboard_files, seen_dashboard_paths, entry.path)
         except Exception as e:
             log.info(f"Could not list directory {dash_dir}: {e}")
     
     log.info(f"Checking {len(dashboard_files)} potential dashboard files")
     
-    for dash_file in dashboard_files:
+    # Read and scan every dashboard in parallel worker threads with a single executor call
+    dashboard_results = scan_dashboard_files(dashboard_files)
+    
+    for dash_file, (entities, error) in zip(dashboard_files, dashboard_results):
         try:
-            if not os.path.isfile(dash_file):
-                continue
-                
             log.info(f"Analyzing dashboard file: {dash_file}")
-            # Use proper PyScript I/O pattern
-            content, error = read_text_file(dash_file)
             if error:
                 log.info(f"Error reading {dash_file}: {error}")
                 continue
             
-            # Extract entities from dashboard content
-            entities = extract_dashboard_entities(content)
             if entities:
                 dashboard_dependencies.update(entities)
                 
                 # Track which file each entity was found in
                 dashboard_filename = dash_file.split('/')[-1]  # Get just the filename
                 for entity in entities:
-                    if entity not in dashboard_file_mapping:
-                        dashboard_file_mapping[entity] = []
                     dashboard_file_mapping[entity].append(dashboard_filename)
                 
                 log.info(f"Dashboard {dashboard_filename} references {len(entities)} helper entities")
@@ -748,150 +888,91 @@ async def analyze_dashboard_dependencies():
     log.info(f"Found {len(dashboard_dependencies)} total entities referenced by dashboards")
     return dashboard_dependencies, dashboard_file_mapping
 
-def extract_dashboard_entities(dashboard_content):
-    """Extract entity references from dashboard YAML content"""
-    if not dashboard_content:
-        return set()
-    
-    entities = set()
-    
-    # Comprehensive patterns for dashboard entity references (including complex names)
-    patterns = [
-        r"entity:\s*['\"]?([a-z0-9_]+\.[a-z0-9_]+)['\"]?",  # entity: sensor.example or entity: "sensor.example"
-        r"entities:\s*\n(?:\s*-\s*['\"]?([a-z0-9_]+\.[a-z0-9_]+)['\"]?)+",  # entities list
-        r"-\s*entity:\s*['\"]?([a-z0-9_]+\.[a-z0-9_]+)['\"]?",  # - entity: sensor.example  
-        r"-\s*['\"]?([a-z0-9_]+\.[a-z0-9_]+)['\"]?",  # - sensor.example (direct entity)
-        r"'([a-z0-9_]+\.[a-z0-9_]+)'",  # 'sensor.example'
-        r'"([a-z0-9_]+\.[a-z0-9_]+)"',  # "sensor.example"
-        r"sensor:\s*['\"]?([a-z0-9_]+\.[a-z0-9_]+)['\"]?",  # sensor: sensor.example
-        r"binary_sensor:\s*['\"]?([a-z0-9_]+\.[a-z0-9_]+)['\"]?",  # binary_sensor: binary_sensor.example
-        r"input_[a-z_]+:\s*['\"]?([a-z0-9_]+\.[a-z0-9_]+)['\"]?",  # input_boolean: input_boolean.example
-        r"card_config.*?entity.*?['\"]([a-z0-9_]+\.[a-z0-9_]+)['\"]",  # card config entity references
-        r"tap_action.*?entity.*?['\"]([a-z0-9_]+\.[a-z0-9_]+)['\"]",  # tap action entity references
-        r"hold_action.*?entity.*?['\"]([a-z0-9_]+\.[a-z0-9_]+)['\"]",  # hold action entity references
-        r"action.*?service_data.*?entity_id.*?['\"]([a-z0-9_]+\.[a-z0-9_]+)['\"]",  # service action entity_id
-        # More flexible pattern for any entity ID in quotes (catches complex names like lock_code_slot_x_name)
-        r"['\"]([a-z_]+\.[a-z0-9_]+)['\"]"
-    ]
-    
-    for pattern in patterns:
-        matches = re.findall(pattern, dashboard_content, re.IGNORECASE | re.MULTILINE)
-        for match in matches:
-            entity_id = match if isinstance(match, str) else match[0]
-            
-            # Only include entities that could be helpers
-            helper_domains = ['binary_sensor', 'sensor', 'input_boolean', 'input_datetime', 'input_number', 'input_select', 'input_text', 'timer', 'counter', 'schedule']
-            is_helper = False
-            for domain in helper_domains:
-                if entity_id.startswith(domain + '.'):
-                    is_helper = True
-                    break
-            if is_helper:
-                entities.add(entity_id)
-    
-    return entities
-
+@pyscript_compile
 def extract_entities_from_template_string(template_str):
     """Extract entity IDs from template strings AND regular YAML strings"""
-    if not isinstance(template_str, str):
-        return set()
-    
-    entities = set()
-    
-    # Regex patterns for entity detection
-    patterns = [
-        # Template functions with entity ID as first parameter  
-        r'(?:states|is_state|state_attr|is_state_attr|has_value|state_translated|device_id|device_name|area_id|area_name)\s*\(\s*[\'"]([a-z_]+\.[a-z0-9_]+)[\'"]',
-        # Direct entity state access (states.domain.entity)
-        r'states\.([a-z_]+)\.([a-z0-9_]+)(?:\.state|\.attributes)',
-        # Entity ID references in quotes
-        r'[\'"]([a-z_]+\.[a-z0-9_]+)[\'"]',
-        # CRITICAL FIX: Direct entity IDs without quotes (like entity_id: input_boolean.sim_auto_busy_calm)
-        r'\b([a-z_]+\.[a-z0-9_]+)\b'
-    ]
-    
-    for pattern in patterns:
-        matches = re.finditer(pattern, template_str, re.IGNORECASE)
-        for match in matches:
-            if len(match.groups()) == 2:
-                # Pattern with domain and entity parts
-                entity_id = f"{match.group(1)}.{match.group(2)}"
-                entities.add(entity_id)
-            else:
-                # Single entity ID
-                entity_id = match.group(1)
-                # Basic validation
-                if '.' in entity_id and len(entity_id.split('.')) == 2:
-                    entities.add(entity_id)
-    
-    return entities
+    # Every match needs a dot, and most YAML values are plain words or numbers
+    if not isinstance(template_str, str) or '.' not in template_str:
+        return frozenset()
+    
+    # State access is tried first at each position, so states.domain.entity.state is
+    # reported as domain.entity; everything else is a direct entity ID, quoted or not
+    # (like entity_id: input_boolean.sim_auto_busy_calm)
+    return frozenset(
+        token or f"{domain}.{name}"
+        for domain, name, token in _TEMPLATE_STRING_ENTITY_RE.findall(template_str)
+    )
+
+# Blueprints and packages repeat the same template snippets many times over, so each
+# distinct string is only scanned once; results are frozensets so they can be shared
+extract_entities_from_template_string = functools.lru_cache(maxsize=4096)(extract_entities_from_template_string)
 
-def analyze_yaml_content(content, file_path):
-    """Analyze YAML content for entity references - both templates AND direct entity_id references"""
+# A whole string with the shape of an entity ID (domain.entity_name) - the domain is
+# letters and underscores, the name letters, digits, underscores and dashes, and
+# neither is underscores/dashes only
+_ENTITY_ID_SHAPE_RE = re.compile(r'_*[A-Za-z][A-Za-z_]*\.[_-]*[A-Za-z0-9][A-Za-z0-9_-]*')
+
+@pyscript_compile
+def analyze_yaml_data(yaml_data):
+    """Analyze parsed YAML for entity references - both templates AND direct entity_id references"""
     entities = set()
     
-    try:
-        yaml_data = yaml.safe_load(content)
-        if yaml_data:
-            # Check templates in the serialized YAML
-            yaml_str = yaml.dump(yaml_data)
-            entities.update(extract_entities_from_template_string(yaml_str))
-            
-            # Enhanced traversal to find direct entity_id references
-            def traverse_dict(obj):
-                if isinstance(obj, dict):
-                    for key, value in obj.items():
-                        if isinstance(value, str):
-                            # Check for template references
-                            entities.update(extract_entities_from_template_string(value))
-                            
-                            # CRITICAL: Check for entity references in ALL string values
-                            # This catches entity_id: input_boolean.sim_auto_busy_calm patterns
-                            if isinstance(value, str) and '.' in value:
-                                # Check if it looks like an entity ID (domain.entity_name)
-                                parts = value.split('.')
-                                if len(parts) == 2:
-                                    domain, entity_name = parts
-                                    # Basic validation - domain should be letters, entity_name alphanumeric with underscores
-                                    if (domain.replace('_', '').isalpha() and 
-                                        entity_name.replace('_', '').replace('-', '').isalnum() and
-                                        len(domain) > 0 and len(entity_name) > 0):
-                                        entities.add(value)
-                                    
-                        elif isinstance(value, list):
-                            # Handle lists - check all items for entity IDs
-                            for item in value:
-                                if isinstance(item, str) and '.' in item:
-                                    parts = item.split('.')
-                                    if len(parts) == 2:
-                                        domain, entity_name = parts
-                                        if (domain.replace('_', '').isalpha() and 
-                                            entity_name.replace('_', '').replace('-', '').isalnum() and
-                                            len(domain) > 0 and len(entity_name) > 0):
-                                            entities.add(item)
-                                elif isinstance(item, (dict, list)):
-                                    traverse_dict(item)
-                            # Also traverse the list structure
-                            traverse_dict(value)
-                        elif isinstance(value, (dict, list)):
-                            traverse_dict(value)
-                            
-                elif isinstance(obj, list):
-                    for item in obj:
-                        if isinstance(item, str):
-                            entities.update(extract_entities_from_template_string(item))
-                        elif isinstance(item, (dict, list)):
-                            traverse_dict(item)
-            
-            traverse_dict(yaml_data)
-            
-    except yaml.YAMLError as e:
-        log.warning(f"Could not parse YAML file {file_path}: {e}")
-    except Exception as e:
-        log.warning(f"Error analyzing file {file_path}: {e}")
+    # Walk the document with an explicit stack of (container, is_mapping_value)
+    # rather than one recursive call per dict and list
+    stack = [(yaml_data, False)]
+    while stack:
+        obj, is_mapping_value = stack.pop()
+        
+        if isinstance(obj, dict):
+            for key, value in obj.items():
+                # Keys can be entity IDs too (customize:, entity-keyed maps)
+                if isinstance(key, str) and '.' in key:
+                    entities.update(extract_entities_from_template_string(key))
+                
+                if isinstance(value, str):
+                    if '.' in value:
+                        # Check for template references
+                        entities.update(extract_entities_from_template_string(value))
+                        
+                        # CRITICAL: Check for entity references in ALL string values
+                        # This catches entity_id: input_boolean.sim_auto_busy_calm patterns
+                        if _ENTITY_ID_SHAPE_RE.fullmatch(value):
+                            entities.add(value)
+                elif isinstance(value, (dict, list)):
+                    stack.append((value, True))
+        
+        elif isinstance(obj, list):
+            for item in obj:
+                if isinstance(item, str):
+                    if '.' in item:
+                        entities.update(extract_entities_from_template_string(item))
+                        
+                        # Lists under a key (entity_id: [...]) hold plain entity IDs
+                        if is_mapping_value and _ENTITY_ID_SHAPE_RE.fullmatch(item):
+                            entities.add(item)
+                elif isinstance(item, (dict, list)):
+                    stack.append((item, False))
     
     return entities
 
+@pyscript_compile
+def walk_yaml_files(root_dir):
+    """Yield every YAML file below root_dir, like os.walk but with one scandir per directory"""
+    stack = [root_dir]
+    while stack:
+        current_dir = stack.pop()
+        try:
+            with os.scandir(current_dir) as entries:
+                for entry in entries:
+                    # Like os.walk, don't descend into symlinked directories
+                    if entry.is_dir():
+                        if not entry.is_symlink():
+                            stack.append(entry.path)
+                    elif entry.name.endswith(('.yaml', '.yml')) and is_scannable_file(entry):
+                        yield entry.path
+        except OSError:
+            continue
+
 def get_config_files():
     """Get list of relevant configuration files"""
     config_dir = '/config'
@@ -900,11 +981,10 @@ def get_config_files():
     # ALL YAML files in config root (not just the basic 4!)
     # This was the bug - we were missing package files in root directory
     try:
-        for file in os.listdir(config_dir):
-            if file.endswith('.yaml') or file.endswith('.yml'):
-                full_path = os.path.join(config_dir, file)
-                if os.path.isfile(full_path):
-                    config_files.append(full_path)
+        with os.scandir(config_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith(('.yaml', '.yml')) and entry.is_file() and is_scannable_file(entry):
+                    config_files.append(entry.path)
     except Exception as e:
         # Fallback to the original 4 files if directory listing fails
         for filename in ['configuration.yaml', 'automations.yaml', 'scripts.yaml', 'scenes.yaml']:
@@ -915,18 +995,15 @@ def get_config_files():
     # Package files
     packages_dir = os.path.join(config_dir, 'packages')
     if os.path.isdir(packages_dir):
-        for root, dirs, files in os.walk(packages_dir):
-            for file in files:
-                if file.endswith('.yaml') or file.endswith('.yml'):
-                    full_path = os.path.join(root, file)
-                    config_files.append(full_path)
-                    # Write debug info to file if we find the specific water monitor package
-                    if 'water_monitor_simulation' in file:
-                        try:
-                            with open('/config/scan_debug.txt', 'a', encoding='utf-8') as f:
-                                f.write(f"Found water monitor package: {full_path}\n")
-                        except:
-                            pass
+        for full_path in walk_yaml_files(packages_dir):
+            config_files.append(full_path)
+            # Write debug info to file if we find the specific water monitor package
+            if 'water_monitor_simulation' in os.path.basename(full_path):
+                try:
+                    with open('/config/scan_debug.txt', 'a', encoding='utf-8') as f:
+                        f.write(f"Found water monitor package: {full_path}\n")
+                except:
+                    pass
     else:
         try:
             with open('/config/scan_debug.txt', 'a', encoding='utf-8') as f:
@@ -937,13 +1014,35 @@ def get_config_files():
     # Blueprint files
     blueprints_dir = os.path.join(config_dir, 'blueprints')
     if os.path.isdir(blueprints_dir):
-        for root, dirs, files in os.walk(blueprints_dir):
-            for file in files:
-                if file.endswith('.yaml') or file.endswith('.yml'):
-                    config_files.append(os.path.join(root, file))
+        config_files.extend(walk_yaml_files(blueprints_dir))
     
     return config_files
 
+@pyscript_compile
+def format_helper_list(header, helpers, prefix=''):
+    """Return header followed by one prefixed line per helper, joined in a single pass"""
+    return header + ''.join([f"{prefix}{helper}\n" for helper in helpers])
+
+# Fixed YAML around each review card in generate_lovelace_cards
+_LOVELACE_CARD_HEADER = (
+    "    state_color: true\n"
+    "    show_header_toggle: false\n"
+    "    card_mod:\n"
+    "      style: |\n"
+    "        ha-card {\n"
+    "          width: 200% !important;\n"
+    "          max-width: none !important;\n"
+    "        }\n"
+    "    entities:\n"
+)
+_LOVELACE_CARD_FOOTER = (
+    "    footer:\n"
+    "      type: graph\n"
+    "      entity: sensor.helper_analysis_status\n"
+    "      detail: 1\n"
+)
+
+@pyscript_compile
 def generate_lovelace_cards(truly_orphaned_helpers, dashboard_only_helpers, helper_details=None):
     """Generate Lovelace YAML for horizontal stack with entities cards for helper review"""
     
@@ -958,75 +1057,55 @@ def generate_lovelace_cards(truly_orphaned_helpers, dashboard_only_helpers, help
     orphaned_chunks = chunk_list(orphaned_sorted, 20)
     dashboard_chunks = chunk_list(dashboard_sorted, 20)
     
-    yaml_content = "# Auto-generated Helper Review Cards\n"
-    yaml_content += "# Copy this YAML into a dashboard to review orphaned and dashboard-only helpers\n"
-    yaml_content += "# Generated by PyScript Helper Analysis\n\n"
-    
-    # Create single column layout with wider cards
-    yaml_content += "type: vertical-stack\n"
-    yaml_content += "card_mod:\n"
-    yaml_content += "  style: |\n"
-    yaml_content += "    ha-card {\n"
-    yaml_content += "      width: 200% !important;\n"
-    yaml_content += "      max-width: none !important;\n"
-    yaml_content += "    }\n"
-    yaml_content += "cards:\n"
+    # Collect the pieces and join once at the end
+    parts = [
+        "# Auto-generated Helper Review Cards\n"
+        "# Copy this YAML into a dashboard to review orphaned and dashboard-only helpers\n"
+        "# Generated by PyScript Helper Analysis\n\n"
+        # Create single column layout with wider cards
+        "type: vertical-stack\n"
+        "card_mod:\n"
+        "  style: |\n"
+        "    ha-card {\n"
+        "      width: 200% !important;\n"
+        "      max-width: none !important;\n"
+        "    }\n"
+        "cards:\n"
+    ]
     
     # Truly Orphaned Helpers section
-    yaml_content += "  # === TRULY ORPHANED HELPERS ===\n"
+    parts.append("  # === TRULY ORPHANED HELPERS ===\n")
     
     if orphaned_chunks:
         for i, chunk in enumerate(orphaned_chunks):
-            card_title = f"🗑️ Truly Orphaned Helpers"
+            card_title = "🗑️ Truly Orphaned Helpers"
             if len(orphaned_chunks) > 1:
                 card_title += f" ({i+1}/{len(orphaned_chunks)})"
             
-            yaml_content += f"  - type: entities\n"
-            yaml_content += f"    title: \"{card_title}\"\n"
-            yaml_content += f"    state_color: true\n"
-            yaml_content += f"    show_header_toggle: false\n"
-            yaml_content += f"    card_mod:\n"
-            yaml_content += f"      style: |\n"
-            yaml_content += f"        ha-card {{\n"
-            yaml_content += f"          width: 200% !important;\n"
-            yaml_content += f"          max-width: none !important;\n"
-            yaml_content += f"        }}\n"
-            yaml_content += f"    entities:\n"
-            
-            for entity in chunk:
-                yaml_content += f"      - entity: {entity}\n"
-            
-            yaml_content += f"    footer:\n"
-            yaml_content += f"      type: graph\n"
-            yaml_content += f"      entity: sensor.helper_analysis_status\n"
-            yaml_content += f"      detail: 1\n"
+            parts.append(f"  - type: entities\n    title: \"{card_title}\"\n")
+            parts.append(_LOVELACE_CARD_HEADER)
+            parts.extend(f"      - entity: {entity}\n" for entity in chunk)
+            parts.append(_LOVELACE_CARD_FOOTER)
     else:
-        yaml_content += "  - type: entities\n"
-        yaml_content += "    title: \"🎉 No Truly Orphaned Helpers\"\n"
-        yaml_content += "    entities:\n"
-        yaml_content += "      - type: custom:text-element\n"
-        yaml_content += "        text: \"All helpers are being used!\"\n"
+        parts.append(
+            "  - type: entities\n"
+            "    title: \"🎉 No Truly Orphaned Helpers\"\n"
+            "    entities:\n"
+            "      - type: custom:text-element\n"
+            "        text: \"All helpers are being used!\"\n"
+        )
     
     # Dashboard-Only Helpers section
-    yaml_content += "  # === DASHBOARD-ONLY HELPERS ===\n"
+    parts.append("  # === DASHBOARD-ONLY HELPERS ===\n")
     
     if dashboard_chunks:
         for i, chunk in enumerate(dashboard_chunks):
-            card_title = f"📊 Dashboard-Only Helpers"
+            card_title = "📊 Dashboard-Only Helpers"
             if len(dashboard_chunks) > 1:
                 card_title += f" ({i+1}/{len(dashboard_chunks)})"
             
-            yaml_content += f"  - type: entities\n"
-            yaml_content += f"    title: \"{card_title}\"\n"
-            yaml_content += f"    state_color: true\n"
-            yaml_content += f"    show_header_toggle: false\n"
-            yaml_content += f"    card_mod:\n"
-            yaml_content += f"      style: |\n"
-            yaml_content += f"        ha-card {{\n"
-            yaml_content += f"          width: 200% !important;\n"
-            yaml_content += f"          max-width: none !important;\n"
-            yaml_content += f"        }}\n"
-            yaml_content += f"    entities:\n"
+            parts.append(f"  - type: entities\n    title: \"{card_title}\"\n")
+            parts.append(_LOVELACE_CARD_HEADER)
             
             for entity in chunk:
                 # Get dashboard source info for dashboard-only helpers
@@ -1041,32 +1120,32 @@ def generate_lovelace_cards(truly_orphaned_helpers, dashboard_only_helpers, help
                         else:
                             dashboard_info = f" ({', '.join(dashboard_sources[:2])} +{len(dashboard_sources)-2} more)"
                 
-                yaml_content += f"      - entity: {entity}\n"
+                parts.append(f"      - entity: {entity}\n")
                 if dashboard_info:
-                    yaml_content += f"        name: \"{entity}{dashboard_info}\"\n"
+                    parts.append(f"        name: \"{entity}{dashboard_info}\"\n")
             
-            yaml_content += f"    footer:\n"
-            yaml_content += f"      type: graph\n"
-            yaml_content += f"      entity: sensor.helper_analysis_status\n"
-            yaml_content += f"      detail: 1\n"
+            parts.append(_LOVELACE_CARD_FOOTER)
     else:
-        yaml_content += "  - type: entities\n"
-        yaml_content += "    title: \"📊 No Dashboard-Only Helpers\"\n"
-        yaml_content += "    entities:\n"
-        yaml_content += "      - type: custom:text-element\n"
-        yaml_content += "        text: \"No helpers are dashboard-only!\"\n"
+        parts.append(
+            "  - type: entities\n"
+            "    title: \"📊 No Dashboard-Only Helpers\"\n"
+            "    entities:\n"
+            "      - type: custom:text-element\n"
+            "        text: \"No helpers are dashboard-only!\"\n"
+        )
     
     # Add summary card at the bottom
-    yaml_content += "\n# Summary Information Card (add separately if desired)\n"
-    yaml_content += "# type: entities\n"
-    yaml_content += "# title: \"📈 Helper Analysis Summary\"\n"
-    yaml_content += "# entities:\n"
-    yaml_content += "#   - sensor.helper_analysis_status\n"
-    yaml_content += f"#   - type: custom:text-element\n"
-    yaml_content += f"#     text: \"Truly Orphaned: {len(orphaned_sorted)} | Dashboard-Only: {len(dashboard_sorted)}\"\n"
-    
-    return yaml_content
-
+    parts.append(
+        "\n# Summary Information Card (add separately if desired)\n"
+        "# type: entities\n"
+        "# title: \"📈 Helper Analysis Summary\"\n"
+        "# entities:\n"
+        "#   - sensor.helper_analysis_status\n"
+        "#   - type: custom:text-element\n"
+        f"#     text: \"Truly Orphaned: {len(orphaned_sorted)} | Dashboard-Only: {len(dashboard_sorted)}\"\n"
+    )
+    
+    return ''.join(parts)
 
 @time_trigger("startup")
 def analyze_helpers_startup():
@@ -1079,6 +1158,7 @@ async def analyze_helpers_async():
     """
     
     log.info("=== Starting Enhanced Helper Analysis with PyScript ===")
+    _attr_cache.clear()
     
     # Get all entities
     try:
@@ -1087,15 +1167,14 @@ async def analyze_helpers_async():
         log.error(f"Failed to get entity names: {e}")
         return
     
-    # DEBUG: Let's see what entity domains we have
-    domain_counts = {}
+    # Group entities by domain once so later passes only visit the domains they need
+    entities_by_domain = defaultdict(list)
     for entity_id in entity_ids:
-        domain = entity_id.split('.')[0]
-        domain_counts[domain] = domain_counts.get(domain, 0) + 1
+        entities_by_domain[entity_id.partition('.')[0]].append(entity_id)
     
     log.info("Entity domains in system:")
-    for domain, count in sorted(domain_counts.items()):
-        log.info(f"  {domain}: {count}")
+    for domain, domain_entities in sorted(entities_by_domain.items()):
+        log.info(f"  {domain}: {len(domain_entities)}")
     
     # Let's examine the entity registry to understand helper patterns
     template_entities_from_registry = []
@@ -1113,38 +1192,38 @@ async def analyze_helpers_async():
     # Use set to prevent duplicates automatically
     helpers_set = set()
     
-    # Traditional helpers
-    for entity_id in entity_ids:
-        if (entity_id.startswith('input_') or 
-            entity_id.startswith('counter.') or 
-            entity_id.startswith('timer.') or
-            entity_id.startswith('variable.')):
-            helpers_set.add(entity_id)
-    
-    # Template helpers from entity registry (this is the missing piece!)
-    for entity_id in template_entities_from_registry:
-        if entity_id in entity_ids:  # Make sure it still exists
-            helpers_set.add(entity_id)
-    
-    # Legacy template sensor detection for any remaining ones
-    for entity_id in entity_ids:
-        if ((entity_id.startswith('sensor.') or entity_id.startswith('binary_sensor.')) and
-            entity_id not in helpers_set and
-            is_template_or_helper_entity(entity_id)):
-            helpers_set.add(entity_id)
+    # One pass over the domain index picks up all three kinds of helper
+    registry_helpers = set(template_entities_from_registry)
+    for domain, domain_entities in entities_by_domain.items():
+        if domain in _HELPER_INPUT_DOMAINS or domain.startswith('input_'):
+            # Traditional helpers
+            helpers_set.update(domain_entities)
+        elif domain in ('sensor', 'binary_sensor'):
+            # Template helpers from entity registry (this is the missing piece!), then
+            # legacy template sensor detection for any remaining ones
+            for entity_id in domain_entities:
+                if entity_id in registry_helpers or is_template_or_helper_entity(entity_id):
+                    helpers_set.add(entity_id)
+        else:
+            # Registry helpers in other domains (group lights, template switches, ...)
+            helpers_set.update(registry_helpers.intersection(domain_entities))
     
-    # Convert back to list for compatibility with rest of code
-    helpers = list(helpers_set)
+    # Convert back to a sorted list for compatibility with rest of code - every
+    # per-category list built from it below comes out already sorted
+    helpers = sorted(helpers_set)
     
 
     
     # Separate traditional helpers from templated sensors
     templated_sensors = [h for h in helpers if h.startswith(('sensor.', 'binary_sensor.'))]
     
+    # Configuration files are listed once and shared by the template and reference scans
+    config_files = get_config_files()
+    
     # Analyze template dependencies
     log.info("=== Analyzing Template Dependencies ===")
     try:
-        template_result, error = analyze_template_dependencies()
+        template_result, error = analyze_template_dependencies(config_files)
         if error:
             log.info(f"Template analysis error: {error}")
             template_dependencies = {}
@@ -1164,15 +1243,15 @@ async def analyze_helpers_async():
         print(f"DEBUG: analyze_integration_config_entries() returned: entities={integration_referenced_entities}, error={error}")
         if error:
             log.info(f"Integration config analysis error: {error}")
-            integration_referenced_entities = []
+            integration_referenced_entities = frozenset()
         else:
-            integration_referenced_entities = integration_referenced_entities or []
+            integration_referenced_entities = integration_referenced_entities or frozenset()
             log.info(f"Integration configs reference {len(integration_referenced_entities)} helper entities")
             print(f"DEBUG: Final integration_referenced_entities: {integration_referenced_entities}")
     except Exception as e:
         print(f"DEBUG: Exception in integration config analysis: {e}")
         log.info(f"Integration config analysis error: {e}")
-        integration_referenced_entities = []
+        integration_referenced_entities = frozenset()
     
     log.info(f"Found {len(helpers)} total helpers to analyze:")
     log.info(f"  - Traditional helpers: {len(helpers) - len(templated_sensors)}")
@@ -1185,18 +1264,16 @@ async def analyze_helpers_async():
         for template_name, dependencies in template_dependencies.items():
             if dependencies:
                 template_referenced_entities.update(dependencies)
-                dep_list = list(dependencies)
-                dep_list.sort()
-                log.info(f"  {template_name}: {', '.join(dep_list)}")
+                log.info(f"  {template_name}: {len(dependencies)} dependencies; first 10: {heapq.nsmallest(10, dependencies)}")
             else:
                 log.info(f"  {template_name}: No dependencies found")
     else:
         log.info("No template dependencies returned")
     
     if template_referenced_entities:
-        template_ref_list = list(template_referenced_entities)
-        template_ref_list.sort()
-        log.info(f"Template helpers reference {len(template_referenced_entities)} total entities: {', '.join(template_ref_list)}")
+        log.info(f"Template helpers reference {len(template_referenced_entities)} total entities; first 10: {heapq.nsmallest(10, template_referenced_entities)}")
+        if _DEBUG:
+            log.info(f"All template references: {', '.join(sorted(template_referenced_entities))}")
     else:
         log.info("No entities referenced by templates")
     
@@ -1217,10 +1294,10 @@ async def analyze_helpers_async():
         dashboard_file_mapping = {}
     
     # Find all entity references in configuration files
-    all_referenced_entities = set()
     config_referenced_entities = set()
-    config_entity_file_mapping = {}  # Maps entity -> list of files
-    config_files = get_config_files()
+    # Maps entity -> files, as a dict used as an insertion-ordered set so repeated
+    # files are dropped in O(1) while keeping first-seen order
+    config_entity_file_mapping = defaultdict(dict)
     
     # Also check for lovelace configuration
     lovelace_files = [
@@ -1228,58 +1305,49 @@ async def analyze_helpers_async():
         '/config/lovelace.yaml',
         '/config/dashboards/lovelace.yaml'
     ]
+    # The root-level ones are usually already listed by get_config_files
+    listed_config_files = set(config_files)
     for lovelace_file in lovelace_files:
-        if os.path.isfile(lovelace_file):
+        if lovelace_file not in listed_config_files and is_scannable_file(lovelace_file):
             config_files.append(lovelace_file)
     
     log.info(f"Analyzing {len(config_files)} configuration files")
     
-
+    # Match every helper ID against each file in a single pass; the worker threads
+    # share one immutable copy of the IDs for the fallback scan
+    helper_ids = tuple(helpers)
+    helper_automaton = build_substring_automaton(helper_ids)
     
-    for file_path in config_files:
-        try:
-            # Try different approaches for file reading in PyScript
-            content = None
-            try:
-                # Use proper PyScript I/O with @pyscript_executor
-                content = read_config_file(file_path)
-            except Exception as e:
-                print(f"Failed to read file {file_path}: {e}")
-                continue
-                    
-            if content:
-                entities_in_file = analyze_yaml_content(content, file_path)
-                all_referenced_entities.update(entities_in_file)
-                config_referenced_entities.update(entities_in_file)
-                
-                # Track which file each entity came from
-                filename = os.path.basename(file_path) if file_path else 'unknown'
-                for entity in entities_in_file:
-                    if entity not in config_entity_file_mapping:
-                        config_entity_file_mapping[entity] = []
-                    if filename not in config_entity_file_mapping[entity]:
-                        config_entity_file_mapping[entity].append(filename)
-
-                # Also check for direct entity ID references (not in templates)
-                direct_matches = []
-                for helper in helpers:
-                    if helper in content:
-                        all_referenced_entities.add(helper)
-                        config_referenced_entities.add(helper)
-                        direct_matches.append(helper)
-                        
-                        # Track the file reference for direct matches too
-                        if helper not in config_entity_file_mapping:
-                            config_entity_file_mapping[helper] = []
-                        if filename not in config_entity_file_mapping[helper]:
-                            config_entity_file_mapping[helper].append(filename)
-                
-
-                        
-        except Exception as e:
-            log.warning(f"Error reading {file_path}: {e}")
+    # Read, parse and scan all config files in parallel worker threads
+    file_results = analyze_config_files(config_files, helper_ids, helper_automaton)
+    for file_path, (entities_in_file, direct_matches, error) in zip(config_files, file_results):
+        if entities_in_file is None:
+            print(f"Failed to read file {file_path}: {error}")
+            continue
+        
+        if error:
+            log.warning(f"Could not analyze YAML file {file_path}: {error}")
+        
+        config_referenced_entities.update(entities_in_file)
+        
+        # Track which file each entity came from
+        filename = os.path.basename(file_path) if file_path else 'unknown'
+        for entity in entities_in_file:
+            config_entity_file_mapping[entity][filename] = None
+        
+        # Also record direct entity ID references (not in templates)
+        config_referenced_entities.update(direct_matches)
+        
+        # Track the file reference for direct matches too
+        for helper in direct_matches:
+            config_entity_file_mapping[helper][filename] = None
     
+    # Config files are the first source of references; the other sources are added
+    # to this copy below, so the per-file loop only fills one set
+    all_referenced_entities = set(config_referenced_entities)
     log.info(f"Total unique entity references found: {len(all_referenced_entities)}")
+    if _DEBUG:
+        log.info(f"Template string cache: {extract_entities_from_template_string.cache_info()}")
     
     # Include template dependencies in the reference check
     all_referenced_entities.update(template_referenced_entities)
@@ -1301,14 +1369,7 @@ async def analyze_helpers_async():
     log.info(f"After including dashboard dependencies: {len(all_referenced_entities)} total references")
     
     # Find which helpers are referenced
-    referenced_helpers = []
-    unreferenced_helpers = []
-    
-    for helper in helpers:
-        if helper in all_referenced_entities:
-            referenced_helpers.append(helper)
-        else:
-            unreferenced_helpers.append(helper)
+    referenced_helpers = sorted(helpers_set & all_referenced_entities)
     
     # Prepare results
     results_dir = '/config/helper_analysis'
@@ -1322,9 +1383,28 @@ async def analyze_helpers_async():
     
     # Helper details with reference tracking
     helper_details = {}
+    
+    # Helpers are bucketed by category as their details are recorded, in helper order
+    actively_used_helpers = []
     dashboard_only_helpers = []
+    truly_orphaned_helpers = []
+    helpers_by_category = {
+        'actively_used': actively_used_helpers,
+        'dashboard_only': dashboard_only_helpers,
+        'orphaned': truly_orphaned_helpers
+    }
+    
+    # Invert template -> entities once, so each helper looks up its templates directly
+    # instead of probing every template's entity set
+    template_files_by_entity = defaultdict(list)
+    for template_file, entities in template_dependencies.items():
+        for entity in entities:
+            template_files_by_entity[entity].append(template_file)
     
     for helper in helpers:
+        # Shared by the normal and the error entry
+        domain = helper.partition('.')[0]
+        is_referenced = helper in all_referenced_entities
         try:
             # Safely get helper state
             try:
@@ -1350,12 +1430,11 @@ async def analyze_helpers_async():
                     reference_sources['config_files'].append('configuration_files')
                 reference_sources['total_references'] += 1
             
-            # Check template references  
-            if template_dependencies:
-                for template_file, entities in template_dependencies.items():
-                    if helper in entities:
-                        reference_sources['templates'].append(template_file)
-                        reference_sources['total_references'] += 1
+            # Check template references - one per template that uses the helper
+            template_files = template_files_by_entity.get(helper)
+            if template_files:
+                reference_sources['templates'].extend(template_files)
+                reference_sources['total_references'] += len(template_files)
             
             # Check dashboard references
             if dashboard_referenced_entities and helper in dashboard_referenced_entities:
@@ -1376,31 +1455,27 @@ async def analyze_helpers_async():
             if reference_sources['total_references'] > 0:
                 if reference_sources['dashboards'] and not reference_sources['config_files'] and not reference_sources['templates']:
                     helper_category = 'dashboard_only'
-                    dashboard_only_helpers.append(helper)
                 else:
                     helper_category = 'actively_used'
             
             helper_details[helper] = {
-                'domain': helper.split('.')[0],
+                'domain': domain,
                 'state': str(helper_state) if helper_state else 'unavailable',
-                'referenced': helper in all_referenced_entities,
+                'referenced': is_referenced,
                 'category': helper_category,
                 'reference_sources': reference_sources
             }
+            helpers_by_category[helper_category].append(helper)
         except Exception as e:
             helper_details[helper] = {
-                'domain': helper.split('.')[0],
+                'domain': domain,
                 'state': 'error',
                 'error': str(e),
-                'referenced': helper in all_referenced_entities,
+                'referenced': is_referenced,
                 'category': 'error',
                 'reference_sources': {'config_files': [], 'templates': [], 'dashboards': [], 'total_references': 0}
             }
     
-    # Count helpers by category
-    actively_used_helpers = [h for h, details in helper_details.items() if details['category'] == 'actively_used']
-    truly_orphaned_helpers = [h for h, details in helper_details.items() if details['category'] == 'orphaned']
-    
     # Save detailed JSON report
     detailed_report = {
         'analysis': {
@@ -1421,47 +1496,48 @@ async def analyze_helpers_async():
         'config_files': config_files
     }
     
+    # Reports are built first, then written together in a single executor call
+    report_writes = []  # (file_path, content, description)
+    
     json_file = os.path.join(results_dir, 'helper_analysis.json')
     try:
-        # Use proper PyScript I/O pattern
-        json_content = json.dumps(detailed_report, indent=2, ensure_ascii=False)
-        success, error = write_text_file(json_file, json_content)
-        if error:
-            log.error(f"Failed to write JSON report: {error}")
+        json_content = _json_dumps_report(detailed_report)
+        report_writes.append((json_file, json_content, 'JSON report'))
     except Exception as e:
         log.error(f"Failed to write JSON report: {e}")
     
+    # Every unreferenced helper, sorted, for the legacy list and the summary
+    all_orphaned_sorted = sorted(truly_orphaned_helpers + dashboard_only_helpers)
+    
     # Save TRULY ORPHANED helpers list (for actual cleanup)
     truly_orphaned_file = os.path.join(results_dir, 'truly_orphaned_helpers.txt')
     try:
-        orphaned_content = "# Truly Orphaned Helpers (SAFE TO DELETE)\n"
-        orphaned_content += f"# Found {len(truly_orphaned_helpers)} helpers with NO references anywhere\n"
-        orphaned_content += "# These helpers are not used in config files, templates, or dashboards\n"
-        orphaned_content += "# Edit this file to remove helpers you want to keep\n"
-        orphaned_content += "# Then use pyscript.delete_helpers_preview (dry run) or pyscript.delete_helpers_execute to process this file\n\n"
-        for helper in sorted(truly_orphaned_helpers):
-            orphaned_content += f"{helper}\n"
+        orphaned_content = format_helper_list(
+            "# Truly Orphaned Helpers (SAFE TO DELETE)\n"
+            f"# Found {len(truly_orphaned_helpers)} helpers with NO references anywhere\n"
+            "# These helpers are not used in config files, templates, or dashboards\n"
+            "# Edit this file to remove helpers you want to keep\n"
+            "# Then use pyscript.delete_helpers_preview (dry run) or pyscript.delete_helpers_execute to process this file\n\n",
+            truly_orphaned_helpers
+        )
         
-        success, error = write_text_file(truly_orphaned_file, orphaned_content)
-        if error:
-            log.error(f"Failed to write truly orphaned helpers file: {error}")
+        report_writes.append((truly_orphaned_file, orphaned_content, 'truly orphaned helpers file'))
     except Exception as e:
         log.error(f"Failed to write truly orphaned helpers file: {e}")
     
     # Save DASHBOARD-ONLY helpers list (for review, not deletion)
     dashboard_only_file = os.path.join(results_dir, 'dashboard_only_helpers.txt')
     try:
-        dashboard_content = "# Dashboard-Only Helpers (REVIEW BEFORE DELETING)\n"
-        dashboard_content += f"# Found {len(dashboard_only_helpers)} helpers used ONLY in dashboards\n"
-        dashboard_content += "# These helpers are not used in config files or templates\n"
-        dashboard_content += "# They may be legitimately used for dashboard display purposes\n"
-        dashboard_content += "# Review carefully before considering for deletion\n\n"
-        for helper in sorted(dashboard_only_helpers):
-            dashboard_content += f"{helper}\n"
+        dashboard_content = format_helper_list(
+            "# Dashboard-Only Helpers (REVIEW BEFORE DELETING)\n"
+            f"# Found {len(dashboard_only_helpers)} helpers used ONLY in dashboards\n"
+            "# These helpers are not used in config files or templates\n"
+            "# They may be legitimately used for dashboard display purposes\n"
+            "# Review carefully before considering for deletion\n\n",
+            dashboard_only_helpers
+        )
         
-        success, error = write_text_file(dashboard_only_file, dashboard_content)
-        if error:
-            log.error(f"Failed to write dashboard-only helpers file: {error}")
+        report_writes.append((dashboard_only_file, dashboard_content, 'dashboard-only helpers file'))
     except Exception as e:
         log.error(f"Failed to write dashboard-only helpers file: {e}")
     
@@ -1469,48 +1545,41 @@ async def analyze_helpers_async():
     orphaned_file = os.path.join(results_dir, 'orphaned_helpers.txt')
     try:
         # Combine truly orphaned and dashboard-only helpers
-        all_orphaned_helpers = truly_orphaned_helpers + dashboard_only_helpers
+        orphaned_content = format_helper_list(
+            "# All Unreferenced Helpers (DEPRECATED - use truly_orphaned_helpers.txt)\n"
+            "# This file contains both truly orphaned AND dashboard-only helpers\n"
+            "# Use 'truly_orphaned_helpers.txt' for safe cleanup instead\n"
+            "# Use 'dashboard_only_helpers.txt' for dashboard review\n\n",
+            all_orphaned_sorted
+        )
         
-        orphaned_content = "# All Unreferenced Helpers (DEPRECATED - use truly_orphaned_helpers.txt)\n"
-        orphaned_content += f"# This file contains both truly orphaned AND dashboard-only helpers\n"
-        orphaned_content += f"# Use 'truly_orphaned_helpers.txt' for safe cleanup instead\n"
-        orphaned_content += f"# Use 'dashboard_only_helpers.txt' for dashboard review\n\n"
-        for helper in sorted(all_orphaned_helpers):
-            orphaned_content += f"{helper}\n"
-        
-        success, error = write_text_file(orphaned_file, orphaned_content)
-        if error:
-            log.error(f"Failed to write orphaned helpers file: {error}")
+        report_writes.append((orphaned_file, orphaned_content, 'orphaned helpers file'))
     except Exception as e:
         log.error(f"Failed to write orphaned helpers file: {e}")
     
     # Save summary report
     summary_file = os.path.join(results_dir, 'helper_summary.txt')
     try:
-        summary_content = "Helper Analysis Summary\n"
-        summary_content += "=" * 50 + "\n\n"
-        summary_content += f"Total helpers analyzed: {len(helpers)}\n"
-        summary_content += f"Helpers with references: {len(referenced_helpers)}\n"
-        all_orphaned_helpers = truly_orphaned_helpers + dashboard_only_helpers
-        summary_content += f"Potentially orphaned: {len(all_orphaned_helpers)}\n"
-        summary_content += f"Configuration files analyzed: {len(config_files)}\n\n"
+        summary_parts = [
+            "Helper Analysis Summary\n"
+            + "=" * 50 + "\n\n"
+            f"Total helpers analyzed: {len(helpers)}\n"
+            f"Helpers with references: {len(referenced_helpers)}\n"
+            f"Potentially orphaned: {len(all_orphaned_sorted)}\n"
+            f"Configuration files analyzed: {len(config_files)}\n\n"
+        ]
         
-        if all_orphaned_helpers:
-            summary_content += "POTENTIALLY ORPHANED HELPERS:\n"
-            for helper in sorted(all_orphaned_helpers):
-                summary_content += f"  - {helper}\n"
-            summary_content += "\n"
+        if all_orphaned_sorted:
+            summary_parts.append(format_helper_list("POTENTIALLY ORPHANED HELPERS:\n", all_orphaned_sorted, "  - "))
+            summary_parts.append("\n")
         
         if referenced_helpers:
-            summary_content += "HELPERS WITH REFERENCES (first 10):\n"
-            for helper in sorted(referenced_helpers)[:10]:
-                summary_content += f"  - {helper}\n"
+            summary_parts.append(format_helper_list("HELPERS WITH REFERENCES (first 10):\n", referenced_helpers[:10], "  - "))
             if len(referenced_helpers) > 10:
-                summary_content += f"  ... and {len(referenced_helpers) - 10} more\n"
+                summary_parts.append(f"  ... and {len(referenced_helpers) - 10} more\n")
         
-        success, error = write_text_file(summary_file, summary_content)
-        if error:
-            log.error(f"Failed to write summary report: {error}")
+        summary_content = ''.join(summary_parts)
+        report_writes.append((summary_file, summary_content, 'summary report'))
     except Exception as e:
         log.error(f"Failed to write summary report: {e}")
     
@@ -1518,14 +1587,17 @@ async def analyze_helpers_async():
     lovelace_file = os.path.join(results_dir, 'helper_review_cards.yaml')
     try:
         lovelace_content = generate_lovelace_cards(truly_orphaned_helpers, dashboard_only_helpers, helper_details)
-        success, error = write_text_file(lovelace_file, lovelace_content)
-        if error:
-            log.error(f"Failed to write Lovelace cards file: {error}")
-        else:
-            log.info(f"Generated Lovelace review cards: {lovelace_file}")
+        report_writes.append((lovelace_file, lovelace_content, 'Lovelace cards file'))
     except Exception as e:
         log.error(f"Failed to write Lovelace cards file: {e}")
     
+    write_results = write_text_files([(file_path, content) for file_path, content, _ in report_writes])
+    for (file_path, _, description), (success, error) in zip(report_writes, write_results):
+        if error:
+            log.error(f"Failed to write {description}: {error}")
+        elif file_path == lovelace_file:
+            log.info(f"Generated Lovelace review cards: {lovelace_file}")
+    
     # Update status sensor
     try:
         sensor_attributes = {
@@ -1557,17 +1629,20 @@ async def analyze_helpers_async():
     
     if dashboard_only_helpers:
         log.info("\nDASHBOARD-ONLY HELPERS (potential cleanup candidates):")
-        for helper in sorted(dashboard_only_helpers)[:10]:
+        for helper in dashboard_only_helpers[:10]:
             log.info(f"  - {helper}")
         if len(dashboard_only_helpers) > 10:
             log.info(f"  ... and {len(dashboard_only_helpers) - 10} more")
     
     if truly_orphaned_helpers:
         log.info("\nTRULY ORPHANED HELPERS:")
-        for helper in sorted(truly_orphaned_helpers)[:10]:
+        for helper in truly_orphaned_helpers[:10]:
             log.info(f"  - {helper}")
         if len(truly_orphaned_helpers) > 10:
             log.info(f"  ... and {len(truly_orphaned_helpers) - 10} more")
     
     log.info(f"\nReports saved to: {results_dir}")
-    log.info("=== HELPER ANALYSIS COMPLETE ===")
\ No newline at end of file
+    log.info("=== HELPER ANALYSIS COMPLETE ===")
+    
+    # Don't hold attribute snapshots between runs
+    _attr_cache.clear()
\ No newline at end of file